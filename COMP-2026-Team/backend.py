@@ -6,7 +6,7 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 # Imports API & Modules internes
-from run.api import check_syntax, run_text
+from run.api import check_syntax, run_text, compile_macro
 from run.parser_text import parse_program_text
 from run.ram_machine import step, is_halted, RAMState
 
@@ -25,6 +25,28 @@ class MoteurRAM:
         err = result.error
         return False, f"Erreur ligne {err.line} : {err.message}\nContexte : {err.text}"
 
+    @staticmethod
+    def compiler_macros(code):
+        """Compile le langage macro (ADD, MUL, COPY, WHILE...) en code RAM annoté ligne par ligne."""
+        programme, err = compile_macro(code)
+        if err:
+            return False, f"Erreur ligne {err.line} : {err.message}\nContexte : {err.text}"
+        if len(MoteurRAM._cartes_macro) >= MoteurRAM._MAX_CARTES:
+            del MoteurRAM._cartes_macro[next(iter(MoteurRAM._cartes_macro))]  # la plus ancienne
+        MoteurRAM._cartes_macro[programme.text.strip()] = programme.source_map
+        return True, programme.text
+
+    # Carte des sources des derniers programmes compilés : code RAM -> ligne macro de chaque instruction
+    _cartes_macro = {}
+    _MAX_CARTES = 32
+
+    @staticmethod
+    def ligne_macro(code, pc):
+        """Ligne du code macro d'où vient l'instruction pc (None si le code n'est pas issu d'une compilation)."""
+        carte = MoteurRAM._cartes_macro.get(code.strip())
+        if carte is None or not 1 <= pc <= len(carte): return None
+        return carte[pc - 1]
+
     @staticmethod
     def executer_tout(code, input_val):
         """Exécute le programme complet et formate la sortie."""
@@ -44,15 +66,36 @@ class MoteurRAM:
             
         return f"Erreur critique : {result.status}\nDétail : {result.error}"
 
+    # Cache du dernier programme parsé : le pas-à-pas re-parse sinon à chaque clic
+    _cache_code = None
+    _cache_programme = None
+
+    @classmethod
+    def _programme(cls, code):
+        if code != cls._cache_code:
+            programme, err = parse_program_text(code)
+            cls._cache_code = code
+            cls._cache_programme = None if err else programme
+        return cls._cache_programme
+
     @staticmethod
     def executer_pas_a_pas(code, registre_etat_dict):
         """
         Exécute une seule instruction.
         Conversion : État GUI (Dict) -> État Moteur (RAMState) -> État GUI (Dict).
         """
-        # 1. Parsing temporaire (le moteur est sans état persistant)
-        programme, err = parse_program_text(code)
-        if err: return registre_etat_dict
+        nouveau_dict, _, _ = MoteurRAM.executer_n_pas(code, registre_etat_dict, 1)
+        return nouveau_dict
+
+    @staticmethod
+    def executer_n_pas(code, registre_etat_dict, n):
+        """
+        Exécute jusqu'à n instructions d'un coup (la conversion GUI <-> moteur n'est faite qu'une fois).
+        Retourne (nouvel état GUI, nombre de pas exécutés, programme terminé ?).
+        """
+        # 1. Parsing (mis en cache tant que le code ne change pas)
+        programme = MoteurRAM._programme(code)
+        if programme is None: return registre_etat_dict, 0, True
 
         # 2. Reconstruction de l'état machine depuis le GUI
         pc_actuel = registre_etat_dict.get('PC', 1)
@@ -66,25 +109,28 @@ class MoteurRAM:
                 except ValueError: pass
 
         state = RAMState(pc=pc_actuel, regs=regs_seulement)
+        taille = len(programme)
 
-        # 3. Vérification de fin de programme
-        if is_halted(state, len(programme)):
-            return registre_etat_dict
+        # 3. Exécution des steps (sécurisé), arrêt en fin de programme
+        faits = 0
+        while faits < n and not is_halted(state, taille):
+            try:
+                state = step(state, programme)
+            except Exception:
+                break
+            faits += 1
 
-        # 4. Exécution du step (sécurisé)
-        try:
-            new_state = step(state, programme)
-        except Exception:
-            return registre_etat_dict
+        if faits == 0:
+            return registre_etat_dict, 0, is_halted(state, taille)
 
-        # 5. Conversion retour vers le GUI
-        nouveau_dict = {'PC': new_state.pc, 'Acc': 0}
+        # 4. Conversion retour vers le GUI
+        nouveau_dict = {'PC': state.pc, 'Acc': 0}
         
-        for k, v in new_state.regs.items():
+        for k, v in state.regs.items():
             nouveau_dict[f"R{k}"] = v
             
         # Force l'affichage de R0/R1 même si nuls (le moteur les supprime par optimisation)
         nouveau_dict.setdefault('R0', 0)
         nouveau_dict.setdefault('R1', 0)
 
-        return nouveau_dict
\ No newline at end of file
+        return nouveau_dict, faits, is_halted(state, taille)
@@ -5,6 +5,9 @@ import os
 from backend import MoteurRAM 
 
 class IDE(tk.Tk):
+    FRAME_MS = 33          # rafraîchissement du panneau pendant une exécution multi-pas (~30 images/s)
+    STEPS_PER_FRAME = 2000 # pas exécutés entre deux images
+
     def __init__(self):
         super().__init__()
 
@@ -13,6 +16,7 @@ class IDE(tk.Tk):
 
         # Initialisation des variables
         self.current_registers = {'PC': 1, 'R0': 0, 'R1': 0, 'Acc': 0}
+        self.sources_macro = {}  # onglet compilé -> zone de texte du code macro d'origine
 
         # --- Styles globaux ---
         style = ttk.Style()
@@ -79,6 +83,8 @@ class IDE(tk.Tk):
         run_menu.add_command(label="Vérifier la Syntaxe", command=self.check_syntax) 
         run_menu.add_separator()
         run_menu.add_command(label="Exécuter (Run)", command=self.run_full_program)
+        run_menu.add_separator()
+        run_menu.add_command(label="Compiler les macros → RAM", command=self.compile_macros)
         menubar.add_cascade(label="Exécution", menu=run_menu)
 
         # Menu Bibliothèque (LIB)
@@ -87,6 +93,14 @@ class IDE(tk.Tk):
         lib_menu.add_separator()
         lib_menu.add_command(label="Insérer FOPEN", command=lambda: self.insert_snippet("R1 = FOPEN \"data.txt\";"))
         lib_menu.add_command(label="Insérer FREAD", command=lambda: self.insert_snippet("R2 = FREAD R1;"))
+        lib_menu.add_separator()
+        # Macros compilées en code RAM (Exécution > Compiler les macros)
+        lib_menu.add_command(label="Macro ADD", command=lambda: self.insert_snippet("ADD R1, R0\n"))
+        lib_menu.add_command(label="Macro MUL", command=lambda: self.insert_snippet("MUL R1, R0, R2\n"))
+        lib_menu.add_command(label="Macro COPY", command=lambda: self.insert_snippet("COPY R2, R0\n"))
+        lib_menu.add_command(label="Macro CLEAR", command=lambda: self.insert_snippet("CLEAR R1\n"))
+        lib_menu.add_command(label="Bloc WHILE", command=lambda: self.insert_snippet("WHILE R0\n  DEC R0\nEND\n"))
+        lib_menu.add_command(label="Sous-programme DEF", command=lambda: self.insert_snippet("DEF DOUBLE x\n  ADD x, x\nEND\n"))
         menubar.add_cascade(label="Bibliothèque (LIB)", menu=lib_menu)
 
         # Menu Help
@@ -102,7 +116,9 @@ class IDE(tk.Tk):
             "Guide d'utilisation :\n\n"
             "1. RUN : Vérifiez la syntaxe avant d'exécuter.\n"
             "2. DEB : Utilisez le panneau de droite pour le pas-à-pas.\n"
-            "3. LIB : Insérez des fonctions spéciales via le menu Bibliothèque."
+            "3. LIB : Insérez des fonctions spéciales via le menu Bibliothèque.\n"
+            "4. MACROS : ADD, MUL, COPY, CLEAR, WHILE et DEF se compilent en code RAM\n"
+            "   via Exécution > Compiler les macros."
         )
         messagebox.showinfo("Aide du Projet", msg)
 
@@ -120,6 +136,7 @@ class IDE(tk.Tk):
         text_area.tag_configure("num", foreground="#cc0000")
         text_area.tag_configure("str", foreground="#e68a00")
         text_area.tag_configure("com", foreground="grey", font=("Menlo", 12, "italic"))
+        text_area.tag_configure("pc", background="#fff3a0")
 
         text_area.bind("<KeyRelease>", lambda e: self.highlight_syntax(text_area))
 
@@ -138,6 +155,7 @@ class IDE(tk.Tk):
             current_tab_id = self.notebook.select()
             if current_tab_id:
                 self.notebook.forget(current_tab_id)
+                self.sources_macro.pop(current_tab_id, None)
                 
                 # Si on a tout fermé, on recrée un onglet vide pour pas laisser l'IDE vide
                 if not self.notebook.tabs():
@@ -150,7 +168,7 @@ class IDE(tk.Tk):
             text_widget.tag_remove(tag, "1.0", tk.END)
 
         self.apply_regex(text_widget, r"\b(if|then|gotof|gotob)\b", "kw")
-        self.apply_regex(text_widget, r"\b(PRINT|FOPEN|FREAD|FWRITE)\b", "lib")
+        self.apply_regex(text_widget, r"\b(PRINT|FOPEN|FREAD|FWRITE|INC|DEC|CLEAR|MOVE|ADD|COPY|MUL|WHILE|END|DEF)\b", "lib")
         self.apply_regex(text_widget, r"\bR\d+\b", "reg")
         self.apply_regex(text_widget, r"\b\d+\b", "num")
         self.apply_regex(text_widget, r"\".*?\"", "str")
@@ -182,25 +200,113 @@ class IDE(tk.Tk):
 
         self.btn_step = ttk.Button(btn_frame, text="Step (Pas à pas)", command=self.debug_step)
         self.btn_step.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=2)
+
+        self.btn_run_n = ttk.Button(btn_frame, text="N pas...", command=self.debug_run_steps)
+        self.btn_run_n.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=2)
         
         self.btn_reset = ttk.Button(btn_frame, text="Reset", command=self.debug_reset)
         self.btn_reset.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=2)
 
+        # Registres surveillés (épinglés en haut de la liste, affichés même à 0)
+        watch_frame = ttk.Frame(self.debug_frame)
+        watch_frame.pack(fill=tk.X, padx=5)
+        self.watch_entry = ttk.Entry(watch_frame, width=8)
+        self.watch_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=2)
+        self.watch_entry.bind("<Return>", lambda e: self.toggle_watch())
+        ttk.Button(watch_frame, text="Épingler / Retirer", command=self.toggle_watch).pack(side=tk.LEFT, padx=2)
+
         columns = ("reg", "val")
         self.tree = ttk.Treeview(self.debug_frame, columns=columns, show="headings", height=20)
         self.tree.heading("reg", text="Registre")
         self.tree.heading("val", text="Valeur")
         self.tree.column("reg", width=80, anchor=tk.CENTER)
         self.tree.column("val", width=100, anchor=tk.CENTER)
+        self.tree.tag_configure("changed", background="#fff2a8")
+        self.tree.tag_configure("pinned", foreground="blue")
         self.tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+
+        # État de l'affichage : on ne touche qu'aux lignes qui changent
+        self.watched = []          # registres épinglés, dans l'ordre d'ajout
+        self.rendered_rows = {}    # iid (nom du registre) -> valeur affichée
+        self.changed_rows = set()  # lignes surlignées au dernier rafraîchissement
+        self.view_pending = None   # identifiant du rafraîchissement programmé (after)
+        self.run_job = None        # exécution "N pas" en cours
         
         self.update_register_view()
 
+    def row_order(self):
+        """Ordre d'affichage : PC/Acc, registres épinglés, puis R0, R1, R2..."""
+        def key(name):
+            if name in ('PC', 'Acc'):
+                return (0, ('PC', 'Acc').index(name))
+            if name in self.watched:
+                return (1, self.watched.index(name))
+            try:
+                return (2, int(name[1:]))
+            except ValueError:
+                return (3, name)
+
+        names = set(self.current_registers) | set(self.watched)
+        return sorted(names, key=key)
+
     def update_register_view(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        for reg, val in self.current_registers.items():
-            self.tree.insert("", tk.END, values=(reg, val))
+        """Applique uniquement la différence entre les registres affichés et l'état courant."""
+        if self.view_pending is not None:
+            self.after_cancel(self.view_pending)
+            self.view_pending = None
+
+        order = self.row_order()
+        first_render = not self.rendered_rows
+        wanted = {name: self.current_registers.get(name, 0) for name in order}
+
+        for name in list(self.rendered_rows):
+            if name not in wanted:
+                self.tree.delete(name)
+                del self.rendered_rows[name]
+                self.changed_rows.discard(name)
+
+        # Les lignes existantes sont déjà dans le bon ordre : une insertion à sa place suffit
+        changed = set()
+        for index, name in enumerate(order):
+            val = wanted[name]
+            pinned = ("pinned",) if name in self.watched else ()
+            if name not in self.rendered_rows:
+                highlight = () if first_render else ("changed",)
+                self.tree.insert("", index, iid=name, values=(name, val), tags=pinned + highlight)
+                changed.add(name)
+            elif self.rendered_rows[name] != val:
+                self.tree.item(name, values=(name, val), tags=pinned + ("changed",))
+                changed.add(name)
+            elif name in self.changed_rows:
+                self.tree.item(name, tags=pinned)
+            self.rendered_rows[name] = val
+        self.changed_rows = changed
+
+    def schedule_register_view(self):
+        """Regroupe les rafraîchissements : au plus un par image (FRAME_MS)."""
+        if self.view_pending is None:
+            self.view_pending = self.after(self.FRAME_MS, self.update_register_view)
+
+    def toggle_watch(self):
+        name = self.watch_entry.get().strip().upper()
+        if not name: return
+        if not name.startswith('R'): name = f"R{name}"
+        if not name[1:].isdigit():
+            messagebox.showerror("Registre", f"Registre invalide : {name}")
+            return
+
+        if name in self.watched:
+            self.watched.remove(name)
+        else:
+            self.watched.append(name)
+        self.watch_entry.delete(0, tk.END)
+
+        # Seul cas où des lignes existantes changent de place
+        self.update_register_view()
+        for index, row in enumerate(self.row_order()):
+            self.tree.move(row, "", index)
+            self.tree.item(row, tags=("pinned",) if row in self.watched else ())
+        self.changed_rows = set()
 
     # =========================================================================
     # CONNEXION AU BACKEND
@@ -239,6 +345,23 @@ class IDE(tk.Tk):
             messagebox.showerror("Erreur Syntaxe", msg)
             self.log(f"[Syntaxe] Erreur : {msg}")
 
+    def compile_macros(self):
+        source = self.get_current_text_widget()
+        ok, resultat = MoteurRAM.compiler_macros(self.get_code())
+        if not ok:
+            messagebox.showerror("Erreur Macro", resultat)
+            self.log(f"[Macros] Erreur : {resultat}")
+            return
+
+        # Le code RAM généré s'ouvre dans un nouvel onglet (chaque ligne indique sa ligne macro)
+        self.new_file()
+        txt = self.get_current_text_widget()
+        txt.insert("1.0", resultat)
+        self.notebook.tab("current", text="Compilé (RAM)")
+        self.sources_macro[self.notebook.select()] = source
+        self.highlight_syntax(txt)
+        self.log(f"[Macros] Compilation OK : {len(resultat.splitlines())} instructions RAM.")
+
     def run_full_program(self):
         code = self.get_code()
         val = simpledialog.askinteger("Entrée", "Valeur pour R0 (Input):")
@@ -249,17 +372,62 @@ class IDE(tk.Tk):
         self.log(resultat)
 
     def debug_step(self):
+        self.stop_run()
         code = self.get_code()
         self.current_registers = MoteurRAM.executer_pas_a_pas(code, self.current_registers)
         self.update_register_view()
-        self.log(f"[Debug] Step exécuté. PC -> {self.current_registers.get('PC', '?')}")
+        self.log(f"[Debug] Step exécuté. PC -> {self.current_registers.get('PC', '?')}{self.show_macro_line()}")
+
+    def debug_run_steps(self):
+        n = simpledialog.askinteger("Exécution multi-pas", "Nombre de pas à exécuter :", initialvalue=100, minvalue=1)
+        if n is None: return
+        self.stop_run()
+        self.log(f"[Debug] Exécution de {n} pas...")
+        self.run_steps_chunk(self.get_code(), n, 0)
+
+    def run_steps_chunk(self, code, restants, total):
+        """Exécute un paquet de pas par image ; l'affichage est regroupé via schedule_register_view."""
+        self.current_registers, faits, termine = MoteurRAM.executer_n_pas(
+            code, self.current_registers, min(restants, self.STEPS_PER_FRAME))
+        total += faits
+        restants -= faits
+        self.schedule_register_view()
+
+        if restants > 0 and faits > 0 and not termine:
+            self.run_job = self.after(self.FRAME_MS, self.run_steps_chunk, code, restants, total)
+            return
+
+        self.run_job = None
+        self.update_register_view()
+        fin = " Programme terminé." if termine else ""
+        self.log(f"[Debug] {total} pas exécutés. PC -> {self.current_registers.get('PC', '?')}{self.show_macro_line()}.{fin}")
+
+    def show_macro_line(self):
+        """
+        Dans un onglet compilé, surligne dans l'onglet macro d'origine la ligne de l'instruction courante.
+        Retourne le complément à afficher dans la console (" (macro Lx)" ou "").
+        """
+        source = self.sources_macro.get(self.notebook.select())
+        if source is None or not source.winfo_exists(): return ""
+        source.tag_remove("pc", "1.0", tk.END)
+        ligne = MoteurRAM.ligne_macro(self.get_code(), self.current_registers.get('PC', 1))
+        if ligne is None: return ""
+        source.tag_add("pc", f"{ligne}.0", f"{ligne}.end")
+        source.see(f"{ligne}.0")
+        return f" (macro L{ligne})"
+
+    def stop_run(self):
+        if self.run_job is not None:
+            self.after_cancel(self.run_job)
+            self.run_job = None
 
     def debug_reset(self):
+        self.stop_run()
         val = simpledialog.askinteger("Debug Initialisation", "Valeur de départ pour R0 :", initialvalue=0)
         if val is None: val = 0
         self.current_registers = {'PC': 1, 'R0': val, 'R1': 0, 'Acc': 0}
         self.update_register_view()
-        self.log(f"[Debug] Reset effectué. R0 = {val}. Prêt à démarrer.")
+        self.log(f"[Debug] Reset effectué. R0 = {val}. Prêt à démarrer.{self.show_macro_line()}")
 
     # --- Fichiers ---
     def open_file(self):
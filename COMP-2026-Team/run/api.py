@@ -1,8 +1,14 @@
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import Optional, Dict
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Iterable, Sequence, Tuple, TYPE_CHECKING
 from .errors import SyntaxErrorInfo
 
+if TYPE_CHECKING:
+    from .equiv import EquivResult
+    from .macro import CompiledProgram
+    from .summary import ProgramSummary
+    from .superopt import SearchResult
+
 @dataclass(frozen=True)
 class SyntaxResult:
     ok: bool
@@ -16,6 +22,7 @@ class ExecResult:
     final_pc: Optional[int] = None
     registers: Optional[Dict[int, int]] = None
     error: Optional[str] = None
+    timings: Optional[Dict[str, float]] = field(default=None, compare=False)  # seconds per stage ("parse", "decode", "execute") when metrics are on
 
 def check_syntax(program_text: str) -> SyntaxResult:
     from .syntax import check_syntax as _check_syntax
@@ -28,3 +35,55 @@ def run_text(program_text: str, input_value: int, max_steps: int = 100_000) -> E
 def run_encoded(program_code: int, input_value: int, max_steps: int = 100_000) -> ExecResult:
     from .executor import run_encoded as _run_encoded
     return _run_encoded(program_code, input_value, max_steps=max_steps)
+
+def summarize_text(program_text: str) -> Optional[ProgramSummary]:
+    """
+    Prove a closed-form summary of the program (None if it has none).
+    Once proven, run_text on that program no longer executes it step by step.
+    """
+    from .summary import summarize_text as _summarize_text
+    return _summarize_text(program_text)
+
+def run_sweep(program_text: str, inputs: Iterable[int], max_steps: int = 100_000) -> Dict[int, ExecResult]:
+    """
+    run_text on every input, sharing execution between inputs that take the same control path.
+    """
+    from .sweep import sweep_text
+    return sweep_text(program_text, inputs, max_steps=max_steps)
+
+def check_equivalence(text_a: str, text_b: str, lo: int = 0, hi: int = 1000, samples: int = 100,
+                      seed: int = 0, max_steps: int = 100_000) -> EquivResult:
+    """
+    Test that two programs compute the same R1 on [lo, hi] (boundary values first,
+    then random samples); stops at the first counterexample.
+    """
+    from .equiv import check_equivalence_text
+    return check_equivalence_text(text_a, text_b, lo=lo, hi=hi, samples=samples, seed=seed,
+                                  max_steps_a=max_steps, max_steps_b=max_steps)
+
+def compile_macro(source: str) -> Tuple[Optional[CompiledProgram], Optional[SyntaxErrorInfo]]:
+    from .macro import compile_macro as _compile_macro
+    return _compile_macro(source)
+
+def superoptimize(reference_text: str, inputs: Sequence[int] = range(8), objective: str = "size",
+                  max_length: Optional[int] = None, registers: Optional[int] = None, max_steps: int = 10_000,
+                  max_candidates: Optional[int] = None, workers: int = 1) -> SearchResult:
+    """
+    Search a shorter (objective "size") or faster ("steps") program equivalent to the reference.
+    By default candidates are shorter than the reference ("size") or no longer ("steps") and at
+    most 4 instructions, use the reference registers, and max_candidates is
+    run.superopt.DEFAULT_MAX_CANDIDATES per verification round.
+    """
+    from .superopt import DEFAULT_MAX_CANDIDATES, superoptimize_text
+    if max_candidates is None:
+        max_candidates = DEFAULT_MAX_CANDIDATES
+    return superoptimize_text(reference_text, inputs=inputs, max_length=max_length, registers=registers,
+                              objective=objective, max_steps=max_steps, workers=workers,
+                              max_candidates=max_candidates)
+
+def export_metrics() -> str:
+    """
+    Runtime counters and latency histograms in Prometheus text format.
+    """
+    from .metrics import export_prometheus
+    return export_prometheus()
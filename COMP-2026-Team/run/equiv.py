@@ -0,0 +1,242 @@
+from __future__ import annotations
+import argparse
+import random
+import sys
+from dataclasses import dataclass, field, replace
+from typing import Iterator, List, Optional, Tuple
+
+from .api import ExecResult
+from .instructions import Instruction
+from .parser_text import parse_program_text
+from .ram_machine import RAMState, initial_state, is_halted, step
+from .summary import cached_summary
+
+# --------------------------
+# Equivalence checking on an input domain.
+# Both programs run side by side on each input; the check stops at the
+# first input where they disagree (different R1, or one halts and the
+# other does not within the shared step budget).
+# --------------------------
+
+SMALL_VALUES = 16  # inputs tried exhaustively right after the boundaries
+
+@dataclass
+class ProgramStats:
+    runs: int = 0
+    total_steps: int = 0
+    max_steps: int = 0
+    timeouts: int = 0
+
+    def add(self, res: ExecResult) -> None:
+        self.runs += 1
+        self.total_steps += res.steps
+        self.max_steps = max(self.max_steps, res.steps)
+        if res.status == "TIMEOUT":
+            self.timeouts += 1
+
+    @property
+    def mean_steps(self) -> float:
+        return self.total_steps / self.runs if self.runs else 0.0
+
+@dataclass(frozen=True)
+class Counterexample:
+    input_value: int
+    result_a: ExecResult
+    result_b: ExecResult
+    minimal: bool = False  # every input of [lo, input_value) was tested and agreed
+
+@dataclass
+class EquivResult:
+    status: str  # "EQUIVALENT" (on the tested inputs) | "DIFFERENT" | "SYNTAX_ERROR"
+    inputs_tested: int = 0
+    counterexample: Optional[Counterexample] = None
+    stats_a: ProgramStats = field(default_factory=ProgramStats)
+    stats_b: ProgramStats = field(default_factory=ProgramStats)
+    error: Optional[str] = None
+
+def input_order(lo: int, hi: int, samples: int = 100, seed: int = 0) -> Iterator[int]:
+    """
+    Boundary-first order over [lo, hi]: lo, lo + 1, hi, then small values
+    from lo + 2 upwards, then random picks. Each input is produced once.
+    """
+    seen = set()
+
+    def fresh(n: int) -> bool:
+        if n in seen or n < lo or n > hi:
+            return False
+        seen.add(n)
+        return True
+
+    for n in (lo, lo + 1, hi):
+        if fresh(n):
+            yield n
+    for n in range(lo + 2, lo + SMALL_VALUES):
+        if fresh(n):
+            yield n
+
+    remaining = hi - lo + 1 - len(seen)
+    if samples >= remaining:
+        for n in range(lo + SMALL_VALUES, hi):
+            if fresh(n):
+                yield n
+        return
+
+    rng = random.Random(seed)
+    for _ in range(samples):
+        n = rng.randint(lo, hi)
+        while not fresh(n):
+            n = rng.randint(lo, hi)
+        yield n
+
+class _Run:
+    """One program running on one input, advanced a slice at a time."""
+
+    def __init__(self, program: List[Instruction], input_value: int, max_steps: int):
+        self.program = program
+        self.max_steps = max_steps
+        self.result: Optional[ExecResult] = None
+
+        summary = cached_summary(program)
+        if summary is not None:
+            self.result = summary.evaluate(input_value, max_steps=max_steps)
+        self.state: RAMState = initial_state(input_value)
+        self.steps = 0
+
+    def advance(self, budget: int) -> None:
+        if self.result is not None:
+            return
+        state, steps, prog_len = self.state, self.steps, len(self.program)
+        limit = min(steps + budget, self.max_steps)
+
+        while steps < limit and not is_halted(state, prog_len):
+            state = step(state, self.program)
+            steps += 1
+
+        self.state, self.steps = state, steps
+        if is_halted(state, prog_len):
+            self.result = ExecResult(status="OK", output=state.regs.get(1, 0), steps=steps,
+                                     final_pc=state.pc, registers=state.regs)
+        elif steps >= self.max_steps:
+            self.result = ExecResult(status="TIMEOUT", steps=steps, final_pc=state.pc, registers=state.regs,
+                                     error=f"Maximum steps exceeded ({self.max_steps}). Program may diverge.")
+
+def _agree(a: ExecResult, b: ExecResult) -> bool:
+    if a.status == "OK" and b.status == "OK":
+        return a.output == b.output
+    return a.status == b.status  # both time out: no evidence of a difference
+
+def compare_on(program_a: List[Instruction], program_b: List[Instruction], input_value: int,
+               max_steps: int = 100_000, slice_steps: int = 1_000) -> Tuple[ExecResult, ExecResult]:
+    """
+    Run both programs interleaved, slice_steps at a time, each under the
+    same budget. Programs with a proven summary are answered at once.
+    """
+    a = _Run(program_a, input_value, max_steps)
+    b = _Run(program_b, input_value, max_steps)
+    while a.result is None or b.result is None:
+        a.advance(slice_steps)
+        b.advance(slice_steps)
+    return a.result, b.result
+
+def check_equivalence(program_a: List[Instruction], program_b: List[Instruction], lo: int = 0, hi: int = 1000,
+                      samples: int = 100, seed: int = 0, max_steps_a: int = 100_000,
+                      max_steps_b: int = 100_000, shrink_limit: int = 10_000) -> EquivResult:
+    """
+    Compare two parsed programs on [lo, hi] in boundary-first order.
+    Both get the shorter of the two step budgets. The first counterexample
+    is shrunk by trying the untested inputs below it in increasing order
+    (at most shrink_limit of them); it is flagged minimal when none was skipped.
+    """
+    max_steps = min(max_steps_a, max_steps_b)
+    res = EquivResult(status="EQUIVALENT")
+    tested = set()
+
+    def test(n: int) -> Optional[Counterexample]:
+        ra, rb = compare_on(program_a, program_b, n, max_steps=max_steps)
+        tested.add(n)
+        res.inputs_tested += 1
+        res.stats_a.add(ra)
+        res.stats_b.add(rb)
+        return None if _agree(ra, rb) else Counterexample(n, ra, rb)
+
+    for n in input_order(lo, hi, samples=samples, seed=seed):
+        found = test(n)
+        if found is None:
+            continue
+
+        budget = shrink_limit
+        minimal = True
+        for m in range(lo, n):
+            if m in tested:
+                continue
+            if budget == 0:
+                minimal = False
+                break
+            budget -= 1
+            smaller = test(m)
+            if smaller is not None:
+                found = smaller
+                break
+
+        res.status = "DIFFERENT"
+        res.counterexample = replace(found, minimal=minimal)
+        return res
+
+    return res
+
+def check_equivalence_text(text_a: str, text_b: str, **kwargs) -> EquivResult:
+    """
+    Same as check_equivalence for programs given as text.
+    """
+    programs = []
+    for name, text in (("A", text_a), ("B", text_b)):
+        program, err = parse_program_text(text)
+        if err is not None:
+            return EquivResult(status="SYNTAX_ERROR",
+                               error=f"Program {name}, line {err.line}: {err.message} | Text: {err.text}")
+        programs.append(program)
+    return check_equivalence(programs[0], programs[1], **kwargs)
+
+def _describe(res: ExecResult) -> str:
+    if res.status == "OK":
+        return f"R1 = {res.output} after {res.steps} steps"
+    return f"{res.status} after {res.steps} steps"
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m run.equiv",
+                                     description="Check that two RAM programs compute the same function.")
+    parser.add_argument("program_a")
+    parser.add_argument("program_b")
+    parser.add_argument("--lo", type=int, default=0)
+    parser.add_argument("--hi", type=int, default=1000)
+    parser.add_argument("--samples", type=int, default=100, help="random inputs after the boundary values")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-steps", type=int, default=100_000)
+    args = parser.parse_args(argv)
+
+    with open(args.program_a) as f:
+        text_a = f.read()
+    with open(args.program_b) as f:
+        text_b = f.read()
+
+    res = check_equivalence_text(text_a, text_b, lo=args.lo, hi=args.hi, samples=args.samples,
+                                 seed=args.seed, max_steps_a=args.max_steps, max_steps_b=args.max_steps)
+    if res.status == "SYNTAX_ERROR":
+        print(res.error)
+        return 2
+
+    if res.counterexample is None:
+        print(f"Equivalent on {res.inputs_tested} tested inputs.")
+    else:
+        c = res.counterexample
+        print(f"Counterexample: R0 = {c.input_value}" + ("" if c.minimal else " (not proven minimal)"))
+        print(f"  A: {_describe(c.result_a)}")
+        print(f"  B: {_describe(c.result_b)}")
+
+    for name, stats in (("A", res.stats_a), ("B", res.stats_b)):
+        print(f"{name}: {stats.runs} runs, {stats.total_steps} steps "
+              f"(mean {stats.mean_steps:.1f}, max {stats.max_steps}), {stats.timeouts} timeouts")
+    return 0 if res.counterexample is None else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
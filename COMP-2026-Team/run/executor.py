@@ -1,17 +1,40 @@
 from __future__ import annotations
+from dataclasses import replace
+from time import perf_counter
 from typing import List
 
+from . import metrics
 from .api import ExecResult
 from .instructions import Instruction
 from .parser_text import parse_program_text
 from .ram_machine import initial_state, is_halted, step
+from .summary import cached_summary
 
 def execute(program: List[Instruction], input_value: int, max_steps: int = 100_000) -> ExecResult:
     """
     Execute a parsed RAM program on a given input.
     Returns ExecResult with status OK or TIMEOUT.
     Output convention: we return R1 (output register) as in the course model.
+    Programs with a proven summary (see summary.py) are answered without running.
     """
+    if not metrics.ENABLED:
+        return _execute(program, input_value, max_steps)
+
+    t0 = perf_counter()
+    result = _execute(program, input_value, max_steps)
+    elapsed = perf_counter() - t0
+
+    metrics.REGISTRY.observe("execute", elapsed)
+    metrics.REGISTRY.record_run(result)
+    return replace(result, timings={"execute": elapsed})
+
+def _execute(program: List[Instruction], input_value: int, max_steps: int) -> ExecResult:
+    summary = cached_summary(program)
+    if summary is not None:
+        result = summary.evaluate(input_value, max_steps=max_steps)
+        if result is not None:
+            return result
+
     state = initial_state(input_value)
     steps = 0
     prog_len = len(program)
@@ -41,13 +64,31 @@ def execute(program: List[Instruction], input_value: int, max_steps: int = 100_0
         error=None
     )
 
+def _failed(result: ExecResult, stage: str, elapsed: float) -> ExecResult:
+    metrics.REGISTRY.record_run(result)
+    return replace(result, timings={stage: elapsed})
+
+def _with_stage(result: ExecResult, stage: str, elapsed: float) -> ExecResult:
+    timings = dict(result.timings or {})
+    timings[stage] = elapsed
+    return replace(result, timings=timings)
+
 def run_text(program_text: str, input_value: int, max_steps: int = 100_000) -> ExecResult:
     """
     Parse and execute a RAM program given as text.
     """
+    instrumented = metrics.ENABLED
+    if instrumented:
+        t0 = perf_counter()
+
     program, err = parse_program_text(program_text)
+
+    if instrumented:
+        parse_time = perf_counter() - t0
+        metrics.REGISTRY.observe("parse", parse_time)
+
     if err is not None:
-        return ExecResult(
+        result = ExecResult(
             status="SYNTAX_ERROR",
             output=None,
             steps=0,
@@ -55,18 +96,24 @@ def run_text(program_text: str, input_value: int, max_steps: int = 100_000) -> E
             registers=None,
             error=f"Line {err.line}: {err.message} | Text: {err.text}"
         )
+        return _failed(result, "parse", parse_time) if instrumented else result
 
-    return execute(program, input_value, max_steps=max_steps)
+    result = execute(program, input_value, max_steps=max_steps)
+    return _with_stage(result, "parse", parse_time) if instrumented else result
 
 def run_encoded(program_code: int, input_value: int, max_steps: int = 100_000) -> ExecResult:
     """
     Decode Godel-encoded program then execute it.
     """
+    instrumented = metrics.ENABLED
+    if instrumented:
+        t0 = perf_counter()
+
     try:
         from .godel import decode_program
         program = decode_program(program_code)
     except Exception as e:
-        return ExecResult(
+        result = ExecResult(
             status="DECODE_ERROR",
             output=None,
             steps=0,
@@ -74,6 +121,15 @@ def run_encoded(program_code: int, input_value: int, max_steps: int = 100_000) -
             registers=None,
             error=str(e)
         )
+        if instrumented:
+            decode_time = perf_counter() - t0
+            metrics.REGISTRY.observe("decode", decode_time)
+            return _failed(result, "decode", decode_time)
+        return result
 
-    return execute(program, input_value, max_steps=max_steps)
+    if instrumented:
+        decode_time = perf_counter() - t0
+        metrics.REGISTRY.observe("decode", decode_time)
 
+    result = execute(program, input_value, max_steps=max_steps)
+    return _with_stage(result, "decode", decode_time) if instrumented else result
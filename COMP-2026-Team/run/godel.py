@@ -107,3 +107,30 @@ def decode_program(GP: int) -> List[Instruction]:
     """
     codes = decode_sequence(GP)
     return [decode_instruction(u) for u in codes]
+
+# --------------------------
+# Encoding (inverse of the decoding above)
+# --------------------------
+
+def encode_instruction(instr: Instruction) -> int:
+    """
+    Course g(i): INC -> 3k, DEC -> 3k + 1, JUMP -> 3 * <b, <k,x>> - 1.
+    """
+    if isinstance(instr, Inc):
+        return 3 * instr.reg
+    if isinstance(instr, Dec):
+        return 3 * instr.reg + 1
+    b = 0 if isinstance(instr, GotoF) else 1
+    return 3 * cantor_pair(b, cantor_pair(instr.reg, instr.offset)) - 1
+
+def encode_sequence(values: List[int]) -> int:
+    seq = 0
+    for a in reversed(values):
+        seq = cantor_pair(a, seq)
+    return seq
+
+def encode_program(program: List[Instruction]) -> int:
+    """
+    G(P) = <g(i1), <g(i2), <... <g(in), 0>...>>
+    """
+    return encode_sequence([encode_instruction(i) for i in program])
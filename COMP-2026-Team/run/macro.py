@@ -0,0 +1,429 @@
+from __future__ import annotations
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from .errors import SyntaxErrorInfo
+from .instructions import Instruction, Inc, Dec, GotoF, GotoB
+from .parser_text import format_instruction, normalize
+
+# --------------------------
+# Macro language compiled to RAM code.
+#
+#   INC Rk / DEC Rk      (or the plain "Rk = Rk + 1" / "Rk = Rk - 1")
+#   CLEAR Rd             Rd := 0
+#   MOVE Rd, Rs          Rd := Rd + Rs, Rs := 0
+#   ADD Rd, Rs           Rd := Rd + Rs
+#   COPY Rd, Rs          Rd := Rs
+#   MUL Rd, Ra, Rb       Rd := Ra * Rb
+#   WHILE Rk ... END     loop while Rk != 0
+#   DEF NAME a b ... END subroutine with register parameters, used as "NAME R2 R3"
+#
+# Code generation tracks which registers are known to be zero (or known
+# non-zero) and which are live, and uses that to drop needless loops,
+# guards and copies. Only R1 is considered live at the end of the program.
+# --------------------------
+
+_RE_REG = re.compile(r"^R(\d+)$")
+_RE_NAME = re.compile(r"^[A-Z_][A-Z0-9_]*$")
+
+_ARITY = {"INC": 1, "DEC": 1, "CLEAR": 1, "MOVE": 2, "ADD": 2, "COPY": 2, "MUL": 3, "WHILE": 1}
+_MAX_CALL_DEPTH = 32
+
+_ONE = -1  # placeholder for the constant register used by unconditional jumps
+
+@dataclass(frozen=True)
+class CompiledProgram:
+    instructions: List[Instruction]
+    source_map: List[Optional[int]]  # macro line of each RAM instruction (None: prologue)
+    text: str                        # RAM source, each line annotated with its macro line
+
+class _MacroError(Exception):
+    def __init__(self, line: int, message: str):
+        super().__init__(message)
+        self.line = line
+
+@dataclass
+class _Stmt:
+    op: str
+    args: Tuple[int, ...]
+    line: int
+    body: List[_Stmt] = field(default_factory=list)
+    live_out: Set[int] = field(default_factory=set)
+
+# (line number, tokens) of one non-empty source line
+_Line = Tuple[int, List[str]]
+
+# --------------------------
+# Parsing
+# --------------------------
+
+def _tokenize(source: str) -> List[_Line]:
+    out: List[_Line] = []
+    for lineno, raw in enumerate(source.splitlines(), start=1):
+        line = normalize(raw.split("#", 1)[0])
+        if not line:
+            continue
+        tokens = line.replace(",", " ").split()
+
+        # plain RAM increments / decrements
+        if len(tokens) == 5 and tokens[1] == "=" and tokens[4] == "1" and tokens[3] in {"+", "-"}:
+            if tokens[0] != tokens[2]:
+                raise _MacroError(lineno, "Expected format: Rk = Rk ± 1 (same register on both sides)")
+            tokens = ["INC" if tokens[3] == "+" else "DEC", tokens[0]]
+        elif tokens[0] == "if":
+            raise _MacroError(lineno, "Raw jumps are not allowed in macro code, use WHILE ... END")
+
+        out.append((lineno, [tokens[0].upper()] + tokens[1:]))
+    return out
+
+def _block_end(lines: List[_Line], i: int) -> int:
+    """
+    Index of the END closing the WHILE/DEF at lines[i].
+    """
+    depth = 0
+    for j in range(i, len(lines)):
+        op = lines[j][1][0]
+        if op in ("WHILE", "DEF"):
+            depth += 1
+        elif op == "END":
+            depth -= 1
+            if depth == 0:
+                return j
+    raise _MacroError(lines[i][0], f"{lines[i][1][0]} without matching END")
+
+def _split_defs(lines: List[_Line]) -> Tuple[List[_Line], Dict[str, Tuple[List[str], List[_Line]]]]:
+    main: List[_Line] = []
+    defs: Dict[str, Tuple[List[str], List[_Line]]] = {}
+    i = 0
+    while i < len(lines):
+        lineno, tokens = lines[i]
+        if tokens[0] != "DEF":
+            main.append(lines[i])
+            i += 1
+            continue
+
+        if len(tokens) < 2 or not _RE_NAME.match(tokens[1].upper()):
+            raise _MacroError(lineno, "Expected: DEF NAME param1 param2 ...")
+        name = tokens[1].upper()
+        if name in _ARITY or name in defs:
+            raise _MacroError(lineno, f"Subroutine name '{name}' is already defined")
+        params = tokens[2:]
+        for p in params:
+            if _RE_REG.match(p) or not _RE_NAME.match(p.upper()):
+                raise _MacroError(lineno, f"Invalid parameter name '{p}'")
+
+        end = _block_end(lines, i)
+        body = lines[i + 1:end]
+        if any(t[0] == "DEF" for _, t in body):
+            raise _MacroError(lineno, "Nested DEF is not allowed")
+        defs[name] = (params, body)
+        i = end + 1
+    return main, defs
+
+def _parse_block(lines: List[_Line], defs, env: Dict[str, int], depth: int) -> List[_Stmt]:
+    stmts: List[_Stmt] = []
+    i = 0
+    while i < len(lines):
+        lineno, tokens = lines[i]
+        op, operands = tokens[0], tokens[1:]
+
+        if op == "END":
+            raise _MacroError(lineno, "END without WHILE or DEF")
+
+        if op in _ARITY:
+            if len(operands) != _ARITY[op]:
+                raise _MacroError(lineno, f"{op} expects {_ARITY[op]} register(s)")
+            args = tuple(_resolve(lineno, t, env) for t in operands)
+            _check_args(lineno, op, args)
+            stmt = _Stmt(op, args, lineno)
+            if op == "WHILE":
+                end = _block_end(lines, i)
+                stmt.body = _parse_block(lines[i + 1:end], defs, env, depth)
+                i = end
+            stmts.append(stmt)
+            i += 1
+            continue
+
+        if op.upper() in defs:
+            params, body = defs[op.upper()]
+            if len(operands) != len(params):
+                raise _MacroError(lineno, f"{op} expects {len(params)} argument(s)")
+            if depth >= _MAX_CALL_DEPTH:
+                raise _MacroError(lineno, "Subroutine calls nested too deeply (recursion?)")
+            inner = {p: _resolve(lineno, t, env) for p, t in zip(params, operands)}
+            stmts.extend(_parse_block(body, defs, inner, depth + 1))
+            i += 1
+            continue
+
+        raise _MacroError(lineno, f"Unknown instruction or subroutine '{op}'")
+    return stmts
+
+def _resolve(lineno: int, token: str, env: Dict[str, int]) -> int:
+    m = _RE_REG.match(token)
+    if m:
+        return int(m.group(1))
+    if token in env:
+        return env[token]
+    raise _MacroError(lineno, f"Register expected like R0, R1... got '{token}'")
+
+def _check_args(lineno: int, op: str, args: Tuple[int, ...]) -> None:
+    if op == "MOVE" and args[0] == args[1]:
+        raise _MacroError(lineno, "MOVE needs two different registers")
+    if op == "MUL" and args[0] in args[1:]:
+        raise _MacroError(lineno, "MUL destination must differ from its operands")
+
+# --------------------------
+# Liveness
+# --------------------------
+
+def _uses_defs(s: _Stmt) -> Tuple[Set[int], Set[int]]:
+    """
+    (registers read, registers fully overwritten) by one statement.
+    """
+    if s.op in ("INC", "DEC"):
+        return {s.args[0]}, set()
+    if s.op == "CLEAR":
+        return set(), {s.args[0]}
+    if s.op in ("MOVE", "ADD"):
+        return set(s.args), set()
+    if s.op == "COPY":
+        return {s.args[1]}, ({s.args[0]} if s.args[0] != s.args[1] else set())
+    if s.op == "MUL":
+        return set(s.args[1:]), {s.args[0]}
+    return {s.args[0]}, set()  # WHILE: the body is handled by _liveness
+
+def _liveness(stmts: List[_Stmt], live_out: Set[int]) -> Set[int]:
+    """
+    Annotate each statement with the registers live after it; returns live-in.
+    """
+    live = set(live_out)
+    for s in reversed(stmts):
+        s.live_out = set(live)
+        if s.op == "WHILE":
+            head = live | {s.args[0]}
+            while True:
+                new = live | {s.args[0]} | _liveness(s.body, head)
+                if new == head:
+                    break
+                head = new
+            live = head
+        else:
+            uses, kills = _uses_defs(s)
+            live = (live - kills) | uses
+    return live
+
+def _modified(stmts: List[_Stmt]) -> Set[int]:
+    regs: Set[int] = set()
+    for s in stmts:
+        if s.op == "WHILE":
+            regs |= _modified(s.body)
+        elif s.op == "MOVE":
+            regs |= set(s.args)
+        else:
+            regs.add(s.args[0])
+    return regs
+
+def _registers(stmts: List[_Stmt]) -> Set[int]:
+    regs: Set[int] = set()
+    for s in stmts:
+        regs |= set(s.args) | _registers(s.body)
+    return regs
+
+# --------------------------
+# Code generation
+# --------------------------
+
+class _Compiler:
+    def __init__(self, used: Set[int]):
+        self.code: List[Instruction] = []
+        self.lines: List[Optional[int]] = []
+        self.used = set(used) | {0, 1}
+        self.maybe: Set[int] = {0}      # registers that may be non-zero (the others are zero)
+        self.nonzero: Set[int] = set()  # registers known to be non-zero
+        self.held: Set[int] = set()     # temporaries in use
+        self.needs_one = False
+
+    def emit(self, instr: Instruction, line: int) -> None:
+        self.code.append(instr)
+        self.lines.append(line)
+
+    def temp(self, live: Set[int], exclude: Set[int]) -> int:
+        """
+        A zero register nobody needs: a dead user register if possible, else a fresh one.
+        Temporaries are handed back zero.
+        """
+        busy = self.maybe | live | exclude | self.held
+        for r in sorted(self.used):
+            if r not in busy:
+                break
+        else:
+            r = max(self.used) + 1
+            self.used.add(r)
+        self.held.add(r)
+        return r
+
+    def release(self, r: int) -> None:
+        self.held.discard(r)
+
+    # --- primitives ---
+
+    def clear(self, d: int, line: int) -> None:
+        if d not in self.maybe:
+            return
+        self.emit(Dec(d), line)
+        self.emit(GotoB(d, 1), line)
+        self.maybe.discard(d)
+        self.nonzero.discard(d)
+
+    def transfer(self, dests: List[int], s: int, line: int) -> None:
+        """
+        Add Rs to every register of dests and leave Rs at 0.
+        """
+        if s not in self.maybe:
+            return
+        size = len(dests) + 1
+        if s not in self.nonzero:
+            # skip the loop when Rs = 0
+            self.emit(GotoF(s, 2), line)
+            self.emit(GotoF(_ONE, size + 2), line)
+            self.needs_one = True
+        for d in dests:
+            self.emit(Inc(d), line)
+        self.emit(Dec(s), line)
+        self.emit(GotoB(s, size), line)
+
+        self.maybe |= set(dests)
+        if s in self.nonzero:
+            self.nonzero |= set(dests)
+        self.maybe.discard(s)
+        self.nonzero.discard(s)
+
+    def loop(self, k: int, modified: Set[int], body: Callable[[], None], line: int) -> None:
+        """
+        while Rk != 0: body(). modified: registers the body may change.
+        """
+        if k not in self.maybe:
+            return
+        guard = k not in self.nonzero
+        self.maybe |= modified
+        self.nonzero -= modified
+        entry_maybe, entry_nonzero = set(self.maybe), set(self.nonzero)
+
+        start = len(self.code)
+        body()
+        size = len(self.code) - start
+        if size == 0:
+            raise _MacroError(line, "Loop body has no effect: it never ends once entered")
+        self.emit(GotoB(k, size), line)
+        if guard:
+            self.code[start:start] = [GotoF(k, 2), GotoF(_ONE, size + 2)]
+            self.lines[start:start] = [line, line]
+            self.needs_one = True
+
+        self.maybe = entry_maybe - {k}
+        self.nonzero = entry_nonzero - {k}
+
+    # --- macros ---
+
+    def add(self, d: int, s: int, live: Set[int], line: int) -> None:
+        if s not in self.maybe:
+            return
+        if d == s:
+            t = self.temp(live, {d})
+            self.transfer([t], d, line)
+            self.transfer([d, d], t, line)
+            self.release(t)
+        elif s not in live:
+            self.transfer([d], s, line)  # source dead afterwards: destructive move
+        else:
+            t = self.temp(live, {d, s})
+            self.transfer([d, t], s, line)
+            self.transfer([s], t, line)
+            self.release(t)
+
+    def mul(self, d: int, a: int, b: int, live: Set[int], line: int) -> None:
+        self.clear(d, line)
+        if a not in self.maybe or b not in self.maybe:
+            return
+
+        # count down a dead operand directly rather than a copy of a live one
+        if a != b and a in live and b not in live:
+            a, b = b, a
+        counter = a
+        if a == b or a in live:
+            counter = self.temp(live, {d, a, b})
+            self.add(counter, a, live | {a, b}, line)
+
+        inner_live = live | {b, counter, d}
+
+        def body() -> None:
+            self.add(d, b, inner_live, line)
+            self.emit(Dec(counter), line)
+
+        self.loop(counter, {d, counter}, body, line)
+        if counter != a:
+            self.release(counter)
+
+    def stmts(self, stmts: List[_Stmt]) -> None:
+        for s in stmts:
+            self.stmt(s)
+
+    def stmt(self, s: _Stmt) -> None:
+        op, args, line, live = s.op, s.args, s.line, s.live_out
+
+        if op == "INC":
+            self.emit(Inc(args[0]), line)
+            self.maybe.add(args[0])
+            self.nonzero.add(args[0])
+        elif op == "DEC":
+            if args[0] in self.maybe:
+                self.emit(Dec(args[0]), line)
+            self.nonzero.discard(args[0])
+        elif op == "CLEAR":
+            self.clear(args[0], line)
+        elif op == "MOVE":
+            self.transfer([args[0]], args[1], line)
+        elif op == "ADD":
+            self.add(args[0], args[1], live, line)
+        elif op == "COPY":
+            if args[0] != args[1]:
+                self.clear(args[0], line)
+                self.add(args[0], args[1], live, line)
+        elif op == "MUL":
+            self.mul(args[0], args[1], args[2], live, line)
+        elif op == "WHILE":
+            self.loop(args[0], _modified(s.body), lambda: self.stmts(s.body), line)
+
+def compile_macro(source: str) -> Tuple[Optional[CompiledProgram], Optional[SyntaxErrorInfo]]:
+    """
+    Compile macro source to RAM instructions.
+    Returns: (program, error_or_None), like parse_program_text.
+    """
+    raw_lines = source.splitlines()
+    try:
+        main, defs = _split_defs(_tokenize(source))
+        stmts = _parse_block(main, defs, {}, 0)
+        _liveness(stmts, {1})
+
+        comp = _Compiler(_registers(stmts))
+        comp.stmts(stmts)
+    except _MacroError as e:
+        text = raw_lines[e.line - 1] if 0 < e.line <= len(raw_lines) else ""
+        return None, SyntaxErrorInfo(line=e.line, message=str(e), text=text)
+
+    code, lines = comp.code, comp.lines
+    if comp.needs_one:
+        one = max(comp.used) + 1
+        code = [Inc(one)] + [_with_reg(i, one) if i.reg == _ONE else i for i in code]
+        lines = [None] + lines
+
+    text_lines = []
+    for instr, line in zip(code, lines):
+        where = "setup" if line is None else f"L{line}: {raw_lines[line - 1].strip()}"
+        text_lines.append(f"{format_instruction(instr)}  # {where}")
+
+    return CompiledProgram(code, lines, "\n".join(text_lines) + "\n"), None
+
+def _with_reg(instr: Instruction, reg: int) -> Instruction:
+    return GotoF(reg, instr.offset) if isinstance(instr, GotoF) else GotoB(reg, instr.offset)
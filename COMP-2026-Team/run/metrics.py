@@ -0,0 +1,144 @@
+from __future__ import annotations
+import os
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .api import ExecResult
+
+# --------------------------
+# Lightweight runtime telemetry.
+# Hooks sit around parse / decode / execute, never inside the step loop.
+# When ENABLED is False the executor skips them entirely (one flag test per call).
+# --------------------------
+
+ENABLED = True
+
+def set_enabled(flag: bool) -> None:
+    """Global instrumentation switch."""
+    global ENABLED
+    ENABLED = flag
+
+Labels = Tuple[Tuple[str, str], ...]
+Sink = Callable[[str, float, Dict[str, str]], None]  # (metric name, value, labels)
+
+# latency buckets in seconds
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self.values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1, labels: Labels = ()) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def get(self, labels: Labels = ()) -> float:
+        return self.values.get(labels, 0)
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = buckets
+        self.counts: List[int] = [0] * (len(buckets) + 1)  # last slot: +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class Registry:
+    """
+    Holds every metric of the RAM runtime and forwards observations to sinks.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sinks: List[Sink] = []
+        self._create_metrics()
+
+    def _create_metrics(self) -> None:
+        self.runs = Counter("ram_runs_total", "Program runs by final status.")
+        self.steps = Counter("ram_steps_total", "RAM instructions executed (or answered by a summary).")
+        self.parse_seconds = Histogram("ram_parse_seconds", "Time spent parsing program text.")
+        self.decode_seconds = Histogram("ram_decode_seconds", "Time spent decoding Godel numbers.")
+        self.execute_seconds = Histogram("ram_execute_seconds", "Time spent executing parsed programs.")
+
+    def add_sink(self, sink: Sink) -> None:
+        self._sinks.append(sink)
+
+    def remove_sink(self, sink: Sink) -> None:
+        self._sinks.remove(sink)
+
+    def _emit(self, name: str, value: float, labels: Dict[str, str]) -> None:
+        for sink in self._sinks:
+            sink(name, value, labels)
+
+    def observe(self, stage: str, seconds: float) -> None:
+        """
+        Record a latency for stage "parse", "decode" or "execute".
+        The histogram is looked up under the lock, so a concurrent reset() cannot drop it.
+        """
+        with self._lock:
+            hist: Histogram = getattr(self, f"{stage}_seconds")
+            hist.observe(seconds)
+        self._emit(hist.name, seconds, {})
+
+    def record_run(self, result: ExecResult) -> None:
+        with self._lock:
+            self.runs.inc(labels=(("status", result.status),))
+            self.steps.inc(result.steps)
+        self._emit(self.runs.name, 1, {"status": result.status})
+        self._emit(self.steps.name, result.steps, {})
+
+    def reset(self) -> None:
+        with self._lock:
+            self._create_metrics()
+
+    def export_prometheus(self) -> str:
+        """
+        Prometheus text exposition format.
+        steps/sec is ram_steps_total / ram_execute_seconds_sum.
+        """
+        lines: List[str] = []
+        with self._lock:
+            for c in (self.runs, self.steps):
+                lines.append(f"# HELP {c.name} {c.help}")
+                lines.append(f"# TYPE {c.name} counter")
+                for labels, v in sorted(c.values.items()):
+                    lines.append(f"{c.name}{_fmt_labels(labels)} {_fmt_value(v)}")
+
+            for h in (self.parse_seconds, self.decode_seconds, self.execute_seconds):
+                lines.append(f"# HELP {h.name} {h.help}")
+                lines.append(f"# TYPE {h.name} histogram")
+                cumulative = 0
+                for bound, n in zip(h.buckets + (None,), h.counts):
+                    cumulative += n
+                    le = "+Inf" if bound is None else repr(bound)
+                    lines.append(f'{h.name}_bucket{{le="{le}"}} {cumulative}')
+                lines.append(f"{h.name}_sum {h.sum!r}")
+                lines.append(f"{h.name}_count {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str) -> None:
+        """Write the exposition to a file, e.g. for the node_exporter textfile collector."""
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(self.export_prometheus())
+        os.replace(tmp, path)
+
+def _fmt_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+def _fmt_value(v: float) -> str:
+    return str(int(v)) if float(v).is_integer() else repr(v)
+
+REGISTRY = Registry()
+
+def export_prometheus(registry: Optional[Registry] = None) -> str:
+    return (registry or REGISTRY).export_prometheus()
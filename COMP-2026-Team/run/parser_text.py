@@ -7,7 +7,7 @@ from .errors import SyntaxErrorInfo
 
 _RE_REG = re.compile(r"^R(\d+)$")
 
-def _normalize(s: str) -> str:
+def normalize(s: str) -> str:
     """
     Normalize unicode variants often copied from PDFs:
     - '−' becomes '-'
@@ -31,7 +31,7 @@ def parse_program_text(program_text: str) -> Tuple[List[Instruction], Optional[S
     lines = program_text.splitlines()
 
     for lineno, raw in enumerate(lines, start=1):
-        line = _normalize(raw)
+        line = normalize(raw)
 
         # allow empty lines and pure comments
         if not line or line.startswith("#"):
@@ -39,7 +39,7 @@ def parse_program_text(program_text: str) -> Tuple[List[Instruction], Optional[S
 
         # allow inline comments
         if "#" in line:
-            line = _normalize(line.split("#", 1)[0])
+            line = normalize(line.split("#", 1)[0])
             if not line:
                 continue
 
@@ -95,3 +95,17 @@ def _parse_line(line: str) -> Instruction:
         return GotoF(k, x) if parts[3] == "gotof" else GotoB(k, x)
 
     raise ValueError("Unknown instruction format")
+
+def format_instruction(instr: Instruction) -> str:
+    """
+    Inverse of _parse_line: the canonical text of one instruction.
+    """
+    if isinstance(instr, Inc):
+        return f"R{instr.reg} = R{instr.reg} + 1"
+    if isinstance(instr, Dec):
+        return f"R{instr.reg} = R{instr.reg} - 1"
+    if isinstance(instr, GotoF):
+        return f"if R{instr.reg} then gotof {instr.offset}"
+    if isinstance(instr, GotoB):
+        return f"if R{instr.reg} then gotob {instr.offset}"
+    raise RuntimeError(f"Unknown instruction type: {instr}")
@@ -0,0 +1,213 @@
+from __future__ import annotations
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from .api import ExecResult
+from .instructions import Instruction, Inc, Dec, GotoB
+from .parser_text import parse_program_text
+from .symbolic import Affine, SymState, ZERO, initial_sym_state, nonneg_on, split_zero, sym_step
+
+# --------------------------
+# Closed-form summaries.
+# The program is executed symbolically on every input n >= 0 at once.
+# Simple counting loops (straight-line body closed by a GotoB on the
+# counter) are jumped over in one go, so a summary is found whenever R1
+# and the step count are piecewise affine in n.
+# --------------------------
+
+@dataclass(frozen=True)
+class SummaryPiece:
+    lo: int
+    hi: Optional[int]  # None: unbounded
+    final_pc: int
+    steps: Affine
+    registers: Dict[int, Affine]
+
+@dataclass(frozen=True)
+class ProgramSummary:
+    pieces: Tuple[SummaryPiece, ...]  # sorted by lo, covering every n >= 0
+
+    def piece_for(self, n: int) -> Optional[SummaryPiece]:
+        if n < 0:
+            return None
+        i = bisect_right([p.lo for p in self.pieces], n) - 1
+        if i < 0:
+            return None
+        piece = self.pieces[i]
+        if piece.hi is not None and n > piece.hi:
+            return None
+        return piece
+
+    def evaluate(self, input_value: int, max_steps: int = 100_000) -> Optional[ExecResult]:
+        """
+        Result of running the program on input_value, or None when the
+        summary does not apply (negative input or step budget exceeded).
+        """
+        piece = self.piece_for(input_value)
+        if piece is None:
+            return None
+        steps = piece.steps.at(input_value)
+        if steps > max_steps:
+            return None
+
+        regs: Dict[int, int] = {}
+        for k, v in piece.registers.items():
+            x = v.at(input_value)
+            if x != 0:
+                regs[k] = x
+
+        return ExecResult(
+            status="OK",
+            output=regs.get(1, 0),
+            steps=steps,
+            final_pc=piece.final_pc,
+            registers=regs,
+            error=None
+        )
+
+    def describe(self) -> str:
+        lines = []
+        for p in self.pieces:
+            hi = "inf" if p.hi is None else str(p.hi)
+            out = p.registers.get(1, ZERO)
+            lines.append(f"n in [{p.lo}, {hi}]: R1 = {out}, steps = {p.steps}")
+        return "\n".join(lines)
+
+@dataclass(frozen=True)
+class _Loop:
+    jump_pc: int
+    reg: int                # counter tested by the GotoB
+    cost: int               # steps per iteration, the GotoB included
+    deltas: Dict[int, int]  # net change per iteration
+    dips: Dict[int, int]    # lowest running change inside one iteration (<= 0)
+
+def _find_loops(program: List[Instruction]) -> Dict[int, _Loop]:
+    """
+    Map loop head pc -> loop, for every GotoB whose body is straight-line
+    and touches its counter register exactly once, with a Dec.
+    """
+    loops: Dict[int, _Loop] = {}
+    for jump_pc, instr in enumerate(program, start=1):
+        if not isinstance(instr, GotoB):
+            continue
+        head = jump_pc - instr.offset
+        if head < 1:
+            continue
+        body = program[head - 1:jump_pc - 1]
+        if not all(isinstance(b, (Inc, Dec)) for b in body):
+            continue
+        if [b for b in body if b.reg == instr.reg] != [Dec(instr.reg)]:
+            continue
+
+        deltas: Dict[int, int] = {}
+        dips: Dict[int, int] = {}
+        for b in body:
+            d = deltas.get(b.reg, 0) + (1 if isinstance(b, Inc) else -1)
+            deltas[b.reg] = d
+            dips[b.reg] = min(dips.get(b.reg, 0), d)
+        loops.setdefault(head, _Loop(jump_pc, instr.reg, len(body) + 1, deltas, dips))
+    return loops
+
+def _accelerate(state: SymState, loop: _Loop) -> Optional[SymState]:
+    """
+    Run every iteration of the loop at once. The counter must be non-zero
+    on the whole interval. Returns None if some Dec in the body could
+    saturate, as the per-iteration deltas would then be wrong.
+    """
+    count = state.regs[loop.reg]  # the counter goes down by one per iteration
+    regs = dict(state.regs)
+
+    for r, d in loop.deltas.items():
+        if r == loop.reg:
+            continue
+        v = state.regs.get(r, ZERO)
+        # worst iteration for a Dec: the first one if r grows, the last one otherwise
+        worst = v if d >= 0 else v + count.shift(-1).scale(d)
+        if not nonneg_on(worst.shift(loop.dips[r]), state.lo, state.hi):
+            return None
+        new = v + count.scale(d)
+        if new.is_zero():
+            regs.pop(r, None)
+        else:
+            regs[r] = new
+
+    regs.pop(loop.reg, None)
+    steps = state.steps + count.scale(loop.cost)
+    return SymState(loop.jump_pc + 1, regs, steps, state.lo, state.hi)
+
+def summarize(program: List[Instruction], max_work: int = 10_000, max_pieces: int = 64) -> Optional[ProgramSummary]:
+    """
+    Derive R1, the step count and the final registers as piecewise affine
+    functions of the input. Returns None if the program cannot be summarised
+    within max_work symbolic steps (non-affine result, divergence, ...).
+    """
+    loops = _find_loops(program)
+    prog_len = len(program)
+    pending: List[SymState] = [initial_sym_state()]
+    pieces: List[SummaryPiece] = []
+    work = 0
+
+    while pending:
+        work += 1
+        if work > max_work:
+            return None
+        state = pending.pop()
+
+        if state.pc > prog_len or state.pc <= 0:
+            pieces.append(SummaryPiece(state.lo, state.hi, state.pc, state.steps, state.regs))
+            if len(pieces) > max_pieces:
+                return None
+            continue
+
+        loop = loops.get(state.pc)
+        if loop is not None:
+            parts = split_zero(state.regs.get(loop.reg, ZERO), state.lo, state.hi)
+            if len(parts) > 1:
+                pending.extend(state.restrict(lo, hi) for lo, hi, _ in parts)
+                continue
+            if not parts[0][2]:
+                accelerated = _accelerate(state, loop)
+                if accelerated is None:
+                    return None
+                pending.append(accelerated)
+                continue
+
+        pending.extend(sym_step(state, program))
+
+    pieces.sort(key=lambda p: p.lo)
+    return ProgramSummary(tuple(pieces))
+
+# --------------------------
+# Cache of proven summaries, consulted by executor.execute
+# --------------------------
+
+_MAX_SUMMARIES = 32
+
+_SUMMARIES: Dict[Tuple[Instruction, ...], ProgramSummary] = {}
+
+def cached_summary(program: List[Instruction]) -> Optional[ProgramSummary]:
+    if not _SUMMARIES:
+        return None
+    return _SUMMARIES.get(tuple(program))
+
+def summarize_program(program: List[Instruction]) -> Optional[ProgramSummary]:
+    """
+    Summarise a parsed program and remember the summary so that later
+    executions of the same program are answered without running it.
+    """
+    key = tuple(program)
+    if key in _SUMMARIES:
+        return _SUMMARIES[key]
+    summary = summarize(program)
+    if summary is not None:
+        if len(_SUMMARIES) >= _MAX_SUMMARIES:
+            del _SUMMARIES[next(iter(_SUMMARIES))]  # oldest first
+        _SUMMARIES[key] = summary
+    return summary
+
+def summarize_text(program_text: str) -> Optional[ProgramSummary]:
+    program, err = parse_program_text(program_text)
+    if err is not None:
+        return None
+    return summarize_program(program)
@@ -0,0 +1,415 @@
+from __future__ import annotations
+import argparse
+import sys
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from .executor import execute
+from .godel import encode_instruction, encode_program
+from .instructions import Instruction, Inc, Dec, GotoF, GotoB
+from .parser_text import format_instruction, parse_program_text
+
+# --------------------------
+# Superoptimizer.
+# Enumerates RAM programs by length, depth first, each position ranging
+# over its instructions in Godel code order, and keeps the first (objective
+# "size") or the fastest (objective "steps") one that matches every sample.
+# A prefix is dropped as soon as no completion can pass the static checks.
+#
+# Candidates never contain a jump leaving [1, |P|+1] or a "gotof 1"
+# (a no-op): a program using them has a shorter or equal equivalent.
+# --------------------------
+
+DEFAULT_MAX_LENGTH = 4            # each extra instruction multiplies the search space
+DEFAULT_MAX_CANDIDATES = 200_000   # candidates executed per search
+
+Sample = Tuple[int, int]      # (input, expected R1)
+_Op = Tuple[int, int, int]    # compiled instruction: (kind, reg, offset)
+_INC, _DEC, _GOTOF, _GOTOB = range(4)
+
+@dataclass(frozen=True)
+class SearchResult:
+    status: str  # "FOUND" | "NOT_FOUND" | "SYNTAX_ERROR" | "REFERENCE_ERROR"
+    program: Optional[List[Instruction]] = None
+    text: Optional[str] = None
+    code: Optional[int] = None          # Godel number G(P)
+    total_steps: int = 0                # summed over the samples
+    candidates: int = 0                 # candidates executed
+    pruned: int = 0                     # candidates and prefixes rejected by static checks
+    error: Optional[str] = None
+
+def _compile(instr: Instruction) -> _Op:
+    if isinstance(instr, Inc):
+        return (_INC, instr.reg, 0)
+    if isinstance(instr, Dec):
+        return (_DEC, instr.reg, 0)
+    if isinstance(instr, GotoF):
+        return (_GOTOF, instr.reg, instr.offset)
+    return (_GOTOB, instr.reg, instr.offset)
+
+def _alphabet(pos: int, length: int, registers: int) -> List[Instruction]:
+    """
+    Instructions allowed at 1-indexed position pos, in Godel code order.
+    """
+    out: List[Instruction] = []
+    for r in range(registers):
+        out.append(Inc(r))
+        out.append(Dec(r))
+        out.extend(GotoF(r, x) for x in range(2, length + 2 - pos))
+        out.extend(GotoB(r, x) for x in range(1, pos))
+    out.sort(key=encode_instruction)
+    return out
+
+# --------------------------
+# Static checks
+# --------------------------
+
+def _statically_useless(ops: Sequence[_Op], need_output: bool) -> bool:
+    """
+    True if the candidate cannot be a minimal solution: unreachable code,
+    R1 never incremented although some output is non-zero, a Dec/test on
+    a register that is always zero, or an Inc/Dec whose register is never
+    tested and is not R1 (it cannot affect the output).
+    """
+    written = {r for kind, r, _ in ops if kind == _INC}
+    tested = {r for kind, r, _ in ops if kind in (_GOTOF, _GOTOB)}
+    if need_output and 1 not in written:
+        return True
+    for kind, r, _ in ops:
+        if kind != _INC and r != 0 and r not in written:
+            return True
+        if kind in (_INC, _DEC) and r != 1 and r not in tested:
+            return True
+
+    n = len(ops)
+    seen: Set[int] = set()
+    todo = [1]
+    while todo:
+        pc = todo.pop()
+        if pc < 1 or pc > n or pc in seen:
+            continue
+        seen.add(pc)
+        kind, _, x = ops[pc - 1]
+        todo.append(pc + 1)
+        if kind == _GOTOF:
+            todo.append(pc + x)
+        elif kind == _GOTOB:
+            todo.append(pc - x)
+    return len(seen) != n
+
+def _dead_prefix(ops: Sequence[_Op], length: int, need_output: bool) -> bool:
+    """
+    True if no completion of the prefix to length instructions passes
+    _statically_useless. Each remaining instruction is at most one missing
+    Inc (of a register decremented or tested, or of R1) or one missing test
+    (of a register other than R1 that is incremented or decremented); and
+    if control cannot leave the prefix, the code after it is unreachable.
+    """
+    written = {r for kind, r, _ in ops if kind == _INC}
+    tested = {r for kind, r, _ in ops if kind in (_GOTOF, _GOTOB)}
+    need_inc = {r for kind, r, _ in ops if kind != _INC and r != 0} - written
+    if need_output and 1 not in written:
+        need_inc.add(1)
+    need_test = {r for kind, r, _ in ops if kind in (_INC, _DEC) and r != 1} - tested
+    n = len(ops)
+    if len(need_inc) + len(need_test) > length - n:
+        return True
+
+    seen: Set[int] = set()
+    todo = [1]
+    while todo:
+        pc = todo.pop()
+        if pc > n:
+            if pc <= length:
+                return False  # the rest of the program is reachable
+            continue
+        if pc < 1 or pc in seen:
+            continue
+        seen.add(pc)
+        kind, _, x = ops[pc - 1]
+        todo.append(pc + 1)
+        if kind == _GOTOF:
+            todo.append(pc + x)
+        elif kind == _GOTOB:
+            todo.append(pc - x)
+    return True
+
+# --------------------------
+# Execution with early exit
+# --------------------------
+
+def _run(ops: Sequence[_Op], pc: int, regs: List[int], steps: int, limit: int, stop: int) -> Tuple[int, int]:
+    """
+    Run while 1 <= pc <= stop and steps < limit. Mutates regs; returns (pc, steps).
+    """
+    while 1 <= pc <= stop and steps < limit:
+        kind, r, x = ops[pc - 1]
+        if kind == _INC:
+            regs[r] += 1
+            pc += 1
+        elif kind == _DEC:
+            regs[r] = regs[r] - 1 if regs[r] > 0 else 0  # saturates like ram_machine.step (R0 may start negative)
+            pc += 1
+        elif kind == _GOTOF:
+            pc = pc + x if regs[r] else pc + 1
+        else:
+            pc = pc - x if regs[r] else pc + 1
+        steps += 1
+    return pc, steps
+
+class _Checker:
+    """
+    Runs candidates on the samples. Candidates arrive in lexicographic
+    order, so the state reached by their shared prefix (everything but the
+    last instruction) is computed once per sample and reused.
+    """
+    def __init__(self, samples: List[Sample], registers: int, max_steps: int):
+        self.samples = list(samples)
+        self.registers = registers
+        self.max_steps = max_steps
+        self.prefix: Optional[Tuple[_Op, ...]] = None
+        self.prefix_states: Dict[int, Tuple[int, Tuple[int, ...], int]] = {}
+
+    def _prefix_state(self, ops: Tuple[_Op, ...], n: int) -> Tuple[int, Tuple[int, ...], int]:
+        prefix = ops[:-1]
+        if prefix != self.prefix:
+            self.prefix = prefix
+            self.prefix_states = {}
+        state = self.prefix_states.get(n)
+        if state is None:
+            regs = [0] * self.registers
+            regs[0] = n
+            pc, steps = _run(ops, 1, regs, 0, self.max_steps, len(prefix))
+            state = (pc, tuple(regs), steps)
+            self.prefix_states[n] = state
+        return state
+
+    def check(self, ops: Tuple[_Op, ...], budget: int) -> Optional[int]:
+        """
+        Total steps over all samples, or None at the first failing sample
+        (or as soon as the total would exceed budget).
+        """
+        total = 0
+        length = len(ops)
+        for i, (n, expected) in enumerate(self.samples):
+            pc, start_regs, steps = self._prefix_state(ops, n)
+            regs = list(start_regs)
+            limit = min(self.max_steps, budget - total)
+            pc, steps = _run(ops, pc, regs, steps, limit, length)
+
+            if steps > limit or 1 <= pc <= length or regs[1] != expected:
+                if i:
+                    # try the sample that killed this candidate first next time
+                    self.samples.insert(0, self.samples.pop(i))
+                return None
+            total += steps
+        return total
+
+# (total steps, rank in enumeration order, program)
+_Found = Tuple[int, Tuple[int, ...], Tuple[Instruction, ...]]
+
+def _search_slice(task: Tuple[List[Sample], int, int, int, str, int, int, int, int]
+                  ) -> Tuple[Optional[_Found], int, int, bool]:
+    """
+    Search the candidates of one length whose first instruction index is
+    first, first + stride, ..., executing at most limit of them.
+    Returns (best match or None, executed, pruned, limit reached).
+    Top-level so that it can run in a worker process.
+    """
+    samples, length, registers, max_steps, objective, first, budget, stride, limit = task
+    alphabets = [_alphabet(pos, length, registers) for pos in range(1, length + 1)]
+    compiled = [[_compile(i) for i in a] for a in alphabets]
+    need_output = any(out != 0 for _, out in samples)
+    checker = _Checker(samples, registers, max_steps)
+
+    best: Optional[_Found] = None
+    executed = pruned = 0
+    exhausted = False
+    rank: List[int] = []
+    ops: List[_Op] = []
+
+    def extend(pos: int, choices: Iterable[int]) -> bool:
+        """Fill position pos (0-indexed) and the ones after it; True stops the search."""
+        nonlocal best, budget, executed, pruned, exhausted
+        for i in choices:
+            rank.append(i)
+            ops.append(compiled[pos][i])
+            stop = False
+            if pos + 1 < length:
+                if _dead_prefix(ops, length, need_output):
+                    pruned += 1
+                else:
+                    stop = extend(pos + 1, range(len(compiled[pos + 1])))
+            elif _statically_useless(ops, need_output):
+                pruned += 1
+            elif executed >= limit:
+                exhausted = stop = True
+            else:
+                executed += 1
+                total = checker.check(tuple(ops), budget)
+                if total is not None:
+                    best = (total, tuple(rank), tuple(alphabets[p][j] for p, j in enumerate(rank)))
+                    stop = objective == "size"
+                    budget = total - 1  # only strictly faster candidates from now on
+            rank.pop()
+            ops.pop()
+            if stop:
+                return True
+        return False
+
+    extend(0, range(first, len(compiled[0]), stride))
+    return best, executed, pruned, exhausted
+
+def _key(found: _Found, objective: str) -> Tuple:
+    total, rank, program = found
+    if objective == "size":
+        return (len(program), rank)  # first in enumeration order
+    return (total, len(program), rank)
+
+def superoptimize(samples: List[Sample], max_length: int = DEFAULT_MAX_LENGTH, registers: int = 3,
+                  objective: str = "size", max_steps: int = 10_000, workers: int = 1,
+                  max_candidates: int = DEFAULT_MAX_CANDIDATES) -> SearchResult:
+    """
+    Find a program matching every (input, R1) sample, using registers
+    R0..R(registers-1) and at most max_length instructions.
+    objective "size": fewest instructions (the first match in Godel order);
+    objective "steps": fewest steps summed over the samples.
+    The search gives up after executing max_candidates candidates.
+    workers > 1 splits each length over processes by first instruction.
+    """
+    if objective not in ("size", "steps"):
+        raise ValueError("objective must be 'size' or 'steps'")
+    samples = list(samples)
+
+    best: Optional[_Found] = None
+    if all(out == 0 for _, out in samples):
+        best = (0, (), ())  # the empty program
+    executed = pruned = 0
+    exhausted = False
+
+    pool = None
+    if workers > 1:
+        import multiprocessing
+        pool = multiprocessing.Pool(workers)
+    stride = workers if pool is not None else 1
+
+    try:
+        for length in range(1, max_length + 1):
+            if objective == "size" and best is not None:
+                break
+            budget = best[0] - 1 if best is not None else sys.maxsize
+            limit = -(-(max_candidates - executed) // stride)  # share of the remaining candidates per slice
+            tasks = [(samples, length, registers, max_steps, objective, first, budget, stride, limit)
+                     for first in range(stride)]
+            results = pool.map(_search_slice, tasks) if pool is not None else map(_search_slice, tasks)
+
+            for found, ex, pr, out in results:
+                executed += ex
+                pruned += pr
+                exhausted = exhausted or out
+                if found is not None and (best is None or _key(found, objective) < _key(best, objective)):
+                    best = found
+            if exhausted:
+                break
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    error = None
+    if exhausted and (best is None or objective == "steps"):
+        error = f"Candidate budget exhausted ({max_candidates}): the search is incomplete"
+    if best is None:
+        return SearchResult(status="NOT_FOUND", candidates=executed, pruned=pruned, error=error)
+
+    program = list(best[2])
+    return SearchResult(
+        status="FOUND",
+        program=program,
+        text="".join(format_instruction(i) + "\n" for i in program),
+        code=encode_program(program),
+        total_steps=best[0],
+        candidates=executed,
+        pruned=pruned,
+        error=error,
+    )
+
+def superoptimize_text(reference_text: str, inputs: Sequence[int] = range(8), max_length: Optional[int] = None,
+                       registers: Optional[int] = None, objective: str = "size", max_steps: int = 10_000,
+                       workers: int = 1, max_candidates: int = DEFAULT_MAX_CANDIDATES,
+                       verify_hi: int = 200, rounds: int = 8) -> SearchResult:
+    """
+    Search a program equivalent to a reference program.
+    Samples are the reference outputs on inputs. Each match is then checked
+    against the reference on [0, verify_hi] (run.equiv); a counterexample
+    becomes a new sample and the search restarts, at most rounds times.
+    By default the search is limited to programs shorter than the reference
+    (objective "size") or no longer than it (objective "steps"), and to
+    DEFAULT_MAX_LENGTH instructions. max_candidates applies to each round.
+    """
+    from .equiv import check_equivalence
+
+    reference, err = parse_program_text(reference_text)
+    if err is not None:
+        return SearchResult(status="SYNTAX_ERROR", error=f"Line {err.line}: {err.message} | Text: {err.text}")
+
+    if max_length is None:
+        max_length = min(DEFAULT_MAX_LENGTH, len(reference) - 1 if objective == "size" else len(reference))
+    if registers is None:
+        registers = max([1] + [i.reg for i in reference]) + 1
+
+    samples: List[Sample] = []
+    for n in inputs:
+        res = execute(reference, n, max_steps=max_steps)
+        if res.status != "OK":
+            return SearchResult(status="REFERENCE_ERROR", error=f"Reference on R0 = {n}: {res.status}")
+        samples.append((n, res.output))
+
+    result = SearchResult(status="NOT_FOUND")
+    for _ in range(rounds):
+        result = superoptimize(samples, max_length=max_length, registers=registers, objective=objective,
+                               max_steps=max_steps, workers=workers, max_candidates=max_candidates)
+        if result.program is None:
+            return result
+        check = check_equivalence(reference, result.program, lo=0, hi=verify_hi, samples=verify_hi + 1,
+                                  max_steps_a=max_steps, max_steps_b=max_steps)  # every input of the range
+        if check.counterexample is None:
+            return result
+        c = check.counterexample
+        if c.result_a.status != "OK":
+            return SearchResult(status="REFERENCE_ERROR", error=f"Reference on R0 = {c.input_value}: {c.result_a.status}")
+        samples.append((c.input_value, c.result_a.output))
+
+    return SearchResult(status="NOT_FOUND", candidates=result.candidates, pruned=result.pruned,
+                        error=f"No verified program after {rounds} rounds")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m run.superopt",
+                                     description="Search a shorter or faster RAM program equivalent to a reference.")
+    parser.add_argument("reference")
+    parser.add_argument("--inputs", type=int, default=8, help="sample inputs 0..N-1")
+    parser.add_argument("--max-length", type=int, default=None)
+    parser.add_argument("--registers", type=int, default=None)
+    parser.add_argument("--objective", choices=("size", "steps"), default="size")
+    parser.add_argument("--max-steps", type=int, default=10_000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--max-candidates", type=int, default=DEFAULT_MAX_CANDIDATES)
+    args = parser.parse_args(argv)
+
+    with open(args.reference) as f:
+        text = f.read()
+
+    res = superoptimize_text(text, inputs=range(args.inputs), max_length=args.max_length,
+                             registers=args.registers, objective=args.objective,
+                             max_steps=args.max_steps, workers=args.workers,
+                             max_candidates=args.max_candidates)
+    print(f"{res.status}: {res.candidates} candidates executed, {res.pruned} pruned statically")
+    if res.error:
+        print(res.error)
+    if res.program is not None:
+        print(f"{len(res.program)} instructions, {res.total_steps} steps on the samples, G(P) = {res.code}")
+        print(res.text, end="")
+    return 0 if res.status == "FOUND" else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+from __future__ import annotations
+from dataclasses import dataclass, field, replace
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from . import metrics
+from .api import ExecResult
+from .executor import execute
+from .instructions import Instruction
+from .parser_text import parse_program_text
+from .summary import cached_summary
+from .symbolic import SymState, initial_sym_state, sym_step
+
+# --------------------------
+# Input sweeps on a shared execution tree.
+# Control flow only depends on zero tests, so inputs that agree on every
+# test so far share one symbolic state (registers affine in R0). A node of
+# the tree is a straight run of such a state; it forks only where a Dec
+# saturates or a jump is taken for some of its inputs and not others.
+# Trees are cached per program and grown on demand, so a sweep costs about
+# the number of distinct control paths instead of inputs x steps.
+# --------------------------
+
+_MAX_TREES = 32
+
+@dataclass
+class _Node:
+    start: SymState                    # steps are the same for every input of the node
+    end: Optional[SymState] = None     # last state of the straight run, once expanded
+    halted: bool = False
+    children: List[_Node] = field(default_factory=list)
+
+_TREES: Dict[Tuple[Instruction, ...], _Node] = {}
+
+def _tree(program: List[Instruction]) -> _Node:
+    key = tuple(program)
+    root = _TREES.get(key)
+    if root is None:
+        if len(_TREES) >= _MAX_TREES:
+            del _TREES[next(iter(_TREES))]  # oldest first
+        root = _Node(initial_sym_state())
+        _TREES[key] = root
+    return root
+
+def _expand(node: _Node, program: List[Instruction], horizon: int) -> None:
+    """
+    Run the node's state until it halts, forks or reaches horizon steps.
+    When cut by the horizon, the rest of the run becomes its single child.
+    """
+    if node.end is not None:
+        return
+    prog_len = len(program)
+    state = node.start
+    while True:
+        if state.pc > prog_len or state.pc <= 0:
+            node.end, node.halted = state, True
+            return
+        if state.steps.const >= horizon:
+            node.end = state
+            node.children = [_Node(state)]
+            return
+        succ = sym_step(state, program)
+        if len(succ) > 1:
+            node.end = state
+            node.children = [_Node(s) for s in succ]
+            return
+        state = succ[0]
+
+def _state_at(node: _Node, program: List[Instruction], steps: int) -> SymState:
+    """
+    State of the node's straight run after exactly `steps` steps (replayed).
+    """
+    state = node.start
+    while state.steps.const < steps:
+        state = sym_step(state, program)[0]
+    return state
+
+def _intersect(lo: int, hi: int, node: _Node) -> Optional[Tuple[int, int]]:
+    lo = max(lo, node.start.lo)
+    if node.start.hi is not None:
+        hi = min(hi, node.start.hi)
+    return (lo, hi) if lo <= hi else None
+
+def _result(state: SymState, n: int, status: str, max_steps: int) -> ExecResult:
+    regs = state.evaluate(n)
+    if status == "OK":
+        return ExecResult(status="OK", output=regs.get(1, 0), steps=state.steps.const,
+                          final_pc=state.pc, registers=regs, error=None)
+    return ExecResult(status="TIMEOUT", output=None, steps=max_steps, final_pc=state.pc, registers=regs,
+                      error=f"Maximum steps exceeded ({max_steps}). Program may diverge.")
+
+def _ranges(inputs: Iterable[int]) -> List[Tuple[int, int]]:
+    """
+    Sorted non-negative inputs grouped into maximal runs [lo, hi].
+    """
+    out: List[Tuple[int, int]] = []
+    for n in sorted(set(inputs)):
+        if out and n == out[-1][1] + 1:
+            out[-1] = (out[-1][0], n)
+        else:
+            out.append((n, n))
+    return out
+
+def sweep(program: List[Instruction], inputs: Iterable[int], max_steps: int = 100_000) -> Dict[int, ExecResult]:
+    """
+    Execute a parsed program on every input; same results as execute(),
+    except that timings is left None: the work is shared between inputs,
+    so there is no per-input execution time to report.
+    """
+    inputs = list(inputs)
+    results: Dict[int, ExecResult] = {}
+    instrumented = metrics.ENABLED
+
+    def done(n: int, res: ExecResult) -> None:
+        results[n] = res
+        if instrumented:
+            metrics.REGISTRY.record_run(res)
+
+    def fallback(n: int) -> None:
+        # execute records its own metrics; its timing is dropped so that every result looks alike
+        results[n] = replace(execute(program, n, max_steps=max_steps), timings=None)
+
+    # negative inputs are outside the symbolic model
+    for n in inputs:
+        if n < 0:
+            fallback(n)
+
+    summary = cached_summary(program)
+    root = _tree(program) if summary is None else None
+
+    for lo, hi in _ranges(n for n in inputs if n >= 0):
+        if summary is not None:
+            for n in range(lo, hi + 1):
+                res = summary.evaluate(n, max_steps=max_steps)
+                if res is None:
+                    fallback(n)
+                else:
+                    done(n, res)
+            continue
+
+        pending: List[Tuple[_Node, int, int]] = [(root, lo, hi)]
+        while pending:
+            node, a, b = pending.pop()
+            _expand(node, program, max_steps)
+            end = node.end
+
+            if node.halted and end.steps.const <= max_steps:
+                for n in range(a, b + 1):
+                    done(n, _result(end, n, "OK", max_steps))
+                continue
+            if end.steps.const >= max_steps:
+                at = end if end.steps.const == max_steps else _state_at(node, program, max_steps)
+                for n in range(a, b + 1):
+                    done(n, _result(at, n, "TIMEOUT", max_steps))
+                continue
+
+            for child in node.children:
+                part = _intersect(a, b, child)
+                if part is not None:
+                    pending.append((child, part[0], part[1]))
+
+    return results
+
+def sweep_text(program_text: str, inputs: Iterable[int], max_steps: int = 100_000) -> Dict[int, ExecResult]:
+    """
+    Parse a RAM program then sweep it over the inputs.
+    """
+    program, err = parse_program_text(program_text)
+    if err is not None:
+        res = ExecResult(
+            status="SYNTAX_ERROR",
+            output=None,
+            steps=0,
+            final_pc=None,
+            registers=None,
+            error=f"Line {err.line}: {err.message} | Text: {err.text}"
+        )
+        return {n: res for n in inputs}
+    return sweep(program, inputs, max_steps=max_steps)
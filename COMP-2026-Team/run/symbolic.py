@@ -0,0 +1,160 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from .instructions import Instruction, Inc, Dec, GotoF, GotoB
+
+# --------------------------
+# Symbolic values: registers as affine functions of the input n = R0.
+# A symbolic state stands for every input n in [lo, hi] (hi=None: unbounded)
+# that follows the same control path. All values are >= 0 on that interval.
+# --------------------------
+
+@dataclass(frozen=True)
+class Affine:
+    """
+    The value const + coef * n, where n is the input placed in R0.
+    """
+    const: int = 0
+    coef: int = 0
+
+    def __add__(self, other: Affine) -> Affine:
+        return Affine(self.const + other.const, self.coef + other.coef)
+
+    def shift(self, k: int) -> Affine:
+        return Affine(self.const + k, self.coef)
+
+    def scale(self, k: int) -> Affine:
+        return Affine(self.const * k, self.coef * k)
+
+    def at(self, n: int) -> int:
+        return self.const + self.coef * n
+
+    def is_zero(self) -> bool:
+        return self.const == 0 and self.coef == 0
+
+    def __str__(self) -> str:
+        if self.coef == 0:
+            return str(self.const)
+        term = "n" if self.coef == 1 else f"{self.coef}n"
+        if self.const == 0:
+            return term
+        sign = "+" if self.const > 0 else "-"
+        return f"{term} {sign} {abs(self.const)}"
+
+ZERO = Affine()
+INPUT = Affine(0, 1)
+
+def nonneg_on(value: Affine, lo: int, hi: Optional[int]) -> bool:
+    """
+    True if value(n) >= 0 for every integer n in [lo, hi].
+    """
+    if value.at(lo) < 0:
+        return False
+    if hi is None:
+        return value.coef >= 0
+    return value.at(hi) >= 0
+
+def split_zero(value: Affine, lo: int, hi: Optional[int]) -> List[Tuple[int, Optional[int], bool]]:
+    """
+    Split [lo, hi] into sub-intervals on which value is either always zero
+    or never zero. Returns (lo, hi, is_zero) triples in increasing order.
+    Assumes value >= 0 on the interval, so a non-constant value has at most one root.
+    """
+    if value.coef == 0:
+        return [(lo, hi, value.const == 0)]
+
+    if (-value.const) % value.coef != 0:
+        return [(lo, hi, False)]
+    n0 = (-value.const) // value.coef
+    if n0 < lo or (hi is not None and n0 > hi):
+        return [(lo, hi, False)]
+
+    parts: List[Tuple[int, Optional[int], bool]] = []
+    if lo <= n0 - 1:
+        parts.append((lo, n0 - 1, False))
+    parts.append((n0, n0, True))
+    if hi is None or n0 + 1 <= hi:
+        parts.append((n0 + 1, hi, False))
+    return parts
+
+@dataclass
+class SymState:
+    pc: int
+    regs: Dict[int, Affine]  # sparse like RAMState: only non-zero stored
+    steps: Affine
+    lo: int
+    hi: Optional[int]
+
+    def restrict(self, lo: int, hi: Optional[int]) -> SymState:
+        """
+        Same state seen on a sub-interval. A single input pins every value to a constant.
+        """
+        if lo == hi:
+            regs = {k: Affine(v.at(lo)) for k, v in self.regs.items() if v.at(lo) != 0}
+            return SymState(self.pc, regs, Affine(self.steps.at(lo)), lo, hi)
+        return SymState(self.pc, dict(self.regs), self.steps, lo, hi)
+
+    def evaluate(self, n: int) -> Dict[int, int]:
+        regs: Dict[int, int] = {}
+        for k, v in self.regs.items():
+            x = v.at(n)
+            if x != 0:
+                regs[k] = x
+        return regs
+
+def initial_sym_state(lo: int = 0, hi: Optional[int] = None) -> SymState:
+    """
+    Symbolic counterpart of ram_machine.initial_state for every input in [lo, hi].
+    """
+    return SymState(pc=1, regs={0: INPUT}, steps=ZERO, lo=lo, hi=hi).restrict(lo, hi)
+
+def _put(regs: Dict[int, Affine], k: int, v: Affine) -> None:
+    if v.is_zero():
+        regs.pop(k, None)
+    else:
+        regs[k] = v
+
+def sym_step(state: SymState, program: List[Instruction]) -> List[SymState]:
+    """
+    Execute one instruction symbolically.
+    Returns one successor per group of inputs that behaves differently
+    (a saturated Dec or a jump taken for some inputs and not others).
+    Assumes state is not halted.
+    """
+    pc = state.pc
+    instr = program[pc - 1]
+
+    if isinstance(instr, Inc):
+        regs = dict(state.regs)
+        _put(regs, instr.reg, regs.get(instr.reg, ZERO).shift(1))
+        return [SymState(pc + 1, regs, state.steps.shift(1), state.lo, state.hi)]
+
+    v = state.regs.get(instr.reg, ZERO)
+    out: List[SymState] = []
+
+    for lo, hi, zero in split_zero(v, state.lo, state.hi):
+        sub = state.restrict(lo, hi)  # copies the registers
+        regs = sub.regs
+        next_pc = pc + 1
+
+        if isinstance(instr, Dec):
+            if zero:
+                regs.pop(instr.reg, None)
+            else:
+                _put(regs, instr.reg, regs.get(instr.reg, ZERO).shift(-1))
+
+        elif isinstance(instr, GotoF):
+            if not zero:
+                next_pc = pc + instr.offset
+
+        elif isinstance(instr, GotoB):
+            if not zero:
+                next_pc = max(pc - instr.offset, 0)
+
+        else:
+            raise RuntimeError(f"Unknown instruction type: {instr}")
+
+        out.append(SymState(next_pc, regs, sub.steps.shift(1), lo, hi))
+
+    return out